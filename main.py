@@ -3,18 +3,18 @@
 # Standard libraries
 import os # allows the interaction with the operating system, like handling files, folders...
 import sys
-import time
-import subprocess
-import threading
-import requests
+import signal
+import asyncio
 import json
+import re
+from collections import deque
+from operator import itemgetter
 # Parsing and networking
 from argparse import ArgumentParser, RawTextHelpFormatter
 from urllib.parse import urlparse
 from argparse import RawTextHelpFormatter
 # Output formatting
 import csv
-import pandas as pd
 # Logging
 import logging
 
@@ -61,73 +61,95 @@ ports = args.port
 tools=args.tool
 target_ip = urlparse(url).hostname # To extract IP from the URL
 results = []
-spinner_running = False
+active_tools = set() # names of the tools currently running, shown by the spinner
 allowed_tools = ["nmap", "whatweb", "wafwoof", "ffuf", "nikto"]
 
 # ─── Tools and Commands ────────────────────────────────────────────────────────
 commands = {
     # General Scanning
-    "Nmap": ["nmap", "-sV", "-p", ports, target_ip],
+    "Nmap": ("nmap", "-sV", "-p", ports, target_ip),
     # Technology Fingerprint
-    "Whatweb": ["whatweb", url],
-    "Wafwoof": ["wafw00f", url],
+    "Whatweb": ("whatweb", url),
+    "Wafwoof": ("wafw00f", url),
     # Directory Enumeration (brute force). Content discovery
-    "Ffuf": ["ffuf", "-u", f"{url}/FUZZ" , "-w", seclist_file, "-of", "json", "-o", "./outputs/ffuf_result.json"], 
+    "Ffuf": ("ffuf", "-u", f"{url}/FUZZ" , "-w", seclist_file, "-of", "json", "-o", "/dev/stdout", "-s"),
     # Vulnerability Scanning
-    "Nikto": ["nikto", "-h", url]
+    "Nikto": ("nikto", "-h", url)
 }
 
+# Built once: map from lowercase tool name to original command key, and the set of valid names
+KEY_MAP = {key.lower(): key for key in commands}
+ALLOWED_LOWER = frozenset(map(str.lower, allowed_tools))
+
+# ─── Output Patterns ──────────────────────────────────────────────────────────
+# Nmap banner and footer lines
+NMAP_SKIP_PREFIXES = ("Starting Nmap", "Nmap scan report for", "Host is up", "Service detection performed.", "Nmap done:")
+# Nikto findings ("+ ..." but not the "+---" separators) and, if they mention a path, the last segment of
+# the first one without its extension ("/admin/config.php:" -> "config"), used to skip findings about the same file
+NIKTO_FINDING = re.compile(r'\+(?!-)(?:.*?\s/(?:\S*/)?((?:\.*[^\s/.])?[^\s/]*?)(?:\.[^\s/.]*)?(?!\S))?.*')
+# Maximum run time in seconds for each tool, so a hung scanner doesn't stall the whole scan
+TOOL_TIMEOUTS = {
+    "Nmap": 600,
+    "Whatweb": 300,
+    "Wafwoof": 300,
+    "Ffuf": 900,
+    "Nikto": 1800
+}
+# How many of the last output lines are kept to report a failure, for the tools whose output is streamed
+ERROR_TAIL_LINES = 50
+
 def filterCommands():
     if tools == "all":
         return commands
     selected_tools = [tool.strip().lower() for tool in tools.split(",")]
-    allowed_lower = [t.lower() for t in allowed_tools]
 
-    invalid_tools = [tool for tool in selected_tools if tool not in allowed_lower]
+    invalid_tools = [tool for tool in selected_tools if tool not in ALLOWED_LOWER]
     if invalid_tools:
         logging.error(f"Invalid tool(s) specified: {', '.join(invalid_tools)}")
         sys.exit(1)
 
-    # Map from lowercase tool name to original command key
-    key_map = {key.lower(): key for key in commands.keys()}
-    filtered = {key_map[tool]: commands[key_map[tool]] for tool in selected_tools}
+    filtered = {KEY_MAP[tool]: commands[KEY_MAP[tool]] for tool in selected_tools}
     return filtered
 
 # ─── Spinner ─────────────────────────────────────────────────────────────
-class Spinner:
-    def __init__(self, message="Processing"):
-        self.spinner = ['|', '/', '-', '\\']
-        self.stop_running = False
-        self.thread = None
-        self.message = message
-
-    def start(self):
-        self.stop_running = False
-        self.thread = threading.Thread(target=self._spin)
-        self.thread.start()
-
-    def _spin(self):
-        i = 0
-        while not self.stop_running:
-            sys.stdout.write(f"\r{self.message} {self.spinner[i % len(self.spinner)]}")
-            sys.stdout.flush()
-            time.sleep(0.1)
-            i += 1
+spinner_width = 0 # length of the status line currently on screen
 
-    def stop(self):
-        self.stop_running = True
-        if self.thread is not None:
-            self.thread.join()
-        sys.stdout.write("\r" + " " * (len(self.message) + 2) + "\r")
+# Also used as a filter on the terminal log handler, so log records don't get glued to the status line
+def clear_spinner_line(record=None):
+    global spinner_width
+    if spinner_width:
+        sys.stdout.write("\r" + " " * spinner_width + "\r")
         sys.stdout.flush()
+        spinner_width = 0
+    return True
+
+# One status line for all the tools that are still running, redrawn from the event loop
+async def spinner(active_tools):
+    global spinner_width
+    frames = ['|', '/', '-', '\\']
+    i = 0
+    try:
+        while True:
+            if active_tools:
+                line = "Running " + " ".join(f"{tool} {frames[i % len(frames)]}" for tool in active_tools)
+                sys.stdout.write("\r" + line.ljust(spinner_width)) # pad with spaces to clear leftovers from a longer previous line
+                sys.stdout.flush()
+                spinner_width = len(line)
+            await asyncio.sleep(0.1)
+            i += 1
+    finally:
+        clear_spinner_line()
 
 # ─── Log Setup ─────────────────────────────────────────────────────────────
+terminal_handler = logging.StreamHandler() # To also show the log in the terminal 
+terminal_handler.addFilter(clear_spinner_line)
+
 logging.basicConfig(
     level=logging.INFO,
     format='[%(asctime)s] %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler("scan_log.log"),
-        logging.StreamHandler() # To also show the log in the terminal 
+        logging.FileHandler("scan_log.log", delay=True), # the file is only created once something is logged
+        terminal_handler
     ]
 )
 
@@ -135,157 +157,238 @@ display_banner()
 logging.info(f"Target URL: {url}")
 logging.info(f"Ports to scan: {ports}")
 
-def log_checking_codes(tool_name, result, output):
+def log_checking_codes(tool_name, returncode, output, raw_output):
     output = output.strip()
     # Handle non-zero exit codes
-    if result.returncode != 0:
+    if returncode != 0:
         if tool_name == "Nikto":
-            if "Nikto v" in output and ("+ Target" in output or "+ Server:" in output):
+            # Nikto also exits non-zero when it reports findings. The "Nikto v" banner is dropped by its line filter,
+            # but the target and server lines only show up when the scan really ran
+            if "+ Target" in output or "+ Server:" in output:
                 logging.info(f"{tool_name} executed successfully.")
             else:
                 logging.error("Nikto failed: no valid output returned.")
-                return f"Error: {output}"
+                return f"Error: {raw_output.strip()}"
         else:
-            logging.error(f"{tool_name} failed with exit code {result.returncode}")
-            return f"Error: {output}"
+            logging.error(f"{tool_name} failed with exit code {returncode}")
+            return f"Error: {raw_output.strip()}"
     else:
         logging.info(f"{tool_name} executed successfully.")
     return output
 
-def get_ffuf_results():
-    ffuf_json_path = "./outputs/ffuf_result.json"
-    with open(ffuf_json_path, "r") as file:
-        data = json.load(file)
+# In silent mode ffuf only prints the matched words, and the JSON report is written to stdout last
+def get_ffuf_results(output):
+    try:
+        import orjson as json_parser # several times faster than json on big reports
+    except ImportError:
+        json_parser = json
+    report = output.rsplit("\n", 1)[-1]
+    try:
+        data = json_parser.loads(report)
+    except ValueError: # also raised by orjson
+        data = None
+    if not isinstance(data, dict): # the last line can also be a matched word that parses as JSON, like "2010"
+        logging.warning("[Ffuf] Could not parse the JSON report")
+        return []
     return data.get("results", [])
 
 # Send a fake request to determine the length of a wildcard response.
-def get_wildcard_length():
+# It runs alongside the scan, so its latency is hidden behind ffuf.
+async def get_wildcard_length():
     fake_url = f"{url}/zz_fake_wildcard_check_path_999"
     try:
-        resp = requests.get(fake_url, timeout=5)
-        return len(resp.text)
+        import aiohttp # imported here because it takes ~200ms to load and is only needed when Ffuf runs
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
+            async with session.get(fake_url) as resp:
+                return len(await resp.read()) # bytes, like ffuf's "length"; decoding could fail on non UTF-8 pages
     except Exception as e:
         logging.warning(f"[Ffuf] Wildcard detection failed: {e}")
         return None
 
+# Pulls the fields shown for each ffuf result in one call
+FFUF_FIELDS = itemgetter("status", "length", "words", "lines")
+
+# A plain comprehension is the fastest option here: building a numpy mask still needs a Python-level pass to pull the lengths out of the dicts
 def filter_by_length(
     ffuf_results, wildcard_length):
         return [result for result in ffuf_results if result["length"] != wildcard_length]
 
-for tool_name, cmd in filterCommands().items():
+# ─── Line Filters ──────────────────────────────────────────────────────────────
+# They clean the output while the tool is still producing it, so only the kept lines are held in memory.
+# The joined result is stripped once, by log_checking_codes
+async def filter_nmap_lines(lines):
+    return "\n".join([line async for line in lines if not line.startswith(NMAP_SKIP_PREFIXES)])
+
+async def filter_wafwoof_lines(lines):
+    seen_lines = []
+    async for line in lines:
+        if "No WAF detected" in line or "is behind" in line:
+            return line # the rest of the output is drained by run_tool
+        seen_lines.append(line)
+    return "\n".join(seen_lines) # no verdict found, keep the whole (short) output
+
+async def filter_nikto_lines(lines):
+    seen_paths = set()
+    filtered_lines = []
+
+    async for line in lines:
+        finding = NIKTO_FINDING.match(line)
+        if not finding:
+            continue  # Skip headers, formatting lines
+
+        basename = finding.group(1)
+        if basename is not None: # an empty basename ("/admin/") still counts as a path
+            if basename in seen_paths:
+                continue
+            seen_paths.add(basename)
+
+        filtered_lines.append(line.strip())
+
+    return "\n".join(filtered_lines)
+
+# Whatweb and Ffuf aren't here: their output is a single line (the ffuf JSON report can be megabytes long) and is read in one go
+LINE_FILTERS = {
+    "Nmap": filter_nmap_lines,
+    "Wafwoof": filter_wafwoof_lines,
+    "Nikto": filter_nikto_lines
+}
+
+# Not "async for line in stream": readline gives up on lines longer than the reader's 64 KiB buffer limit
+async def read_lines(stream, output_tail):
+    while True:
+        raw_line = bytearray()
+        try:
+            while True:
+                try:
+                    raw_line += await stream.readuntil(b"\n")
+                    break
+                except asyncio.LimitOverrunError as e: # a long line, take what's buffered and keep reading it
+                    raw_line += await stream.read(e.consumed)
+        except asyncio.IncompleteReadError as e: # end of the output
+            raw_line += e.partial
+            if not raw_line:
+                return
+        line = raw_line.decode(errors="replace").rstrip("\r\n")
+        output_tail.append(line)
+        yield line
+
+# Returns the cleaned and the raw output once the tool has exited
+async def collect_output(tool_name, proc):
+    line_filter = LINE_FILTERS.get(tool_name)
+    if line_filter:
+        output_tail = deque(maxlen=ERROR_TAIL_LINES) # last raw lines, in case the tool fails
+        output = await line_filter(read_lines(proc.stdout, output_tail))
+        async for _ in read_lines(proc.stdout, output_tail): # drain whatever the filter didn't need to read
+            pass
+        raw_output = "\n".join(output_tail)
+    else:
+        output = raw_output = (await proc.stdout.read()).decode(errors="replace")
+
+    await proc.wait()
+    return output, raw_output
+
+# The tools don't depend on each other, so they all run at the same time and the scan takes as long as the slowest one
+async def run_tool(tool_name, cmd):
     logging.info(f"Running {tool_name}")
-    spinner = Spinner(f"Running {tool_name}")
-    spinner.start()
-    
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-    
-    spinner.stop()
-    
-    output = result.stdout  # TODO: refactor this, I don't like variable mutation
-    output = log_checking_codes(tool_name, result, output)
-
-    # Clean outputs
-    if tool_name == "Wafwoof":
-        for line in output.splitlines():
-            if "No WAF detected" in line or "is behind" in line:
-                output = line
-                break
-    elif tool_name == "Whatweb":
-        output = output.split(" ", 1)[1]
-    elif tool_name == "Nmap":
-        filtered_lines = []
-        for line in output.splitlines():
-            if not (
-                line.startswith("Starting Nmap") or
-                line.startswith("Nmap scan report for") or
-                line.startswith("Host is up") or
-                line.startswith("Service detection performed.") or
-                line.startswith("Nmap done:")
-            ):
-                filtered_lines.append(line)
-        output = "\n".join(filtered_lines).strip()
-    elif tool_name == "Ffuf":
-        ffuf_results = get_ffuf_results()
-        wildcard_length = get_wildcard_length()
-        if wildcard_length is not None:
-            filtered_results = filter_by_length(ffuf_results, wildcard_length)
+    # Each tool gets its own process group, so it can be killed together with anything it started
+    proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, start_new_session=True)
+    active_tools.add(tool_name)
+    timeout = TOOL_TIMEOUTS[tool_name]
+
+    try:
+        output, raw_output = await asyncio.wait_for(collect_output(tool_name, proc), timeout=timeout)
+    except asyncio.TimeoutError:
+        logging.error(f"{tool_name} timed out after {timeout}s")
+        return tool_name, f"Error: {tool_name} timed out after {timeout}s"
+    finally:
+        active_tools.discard(tool_name)
+        if proc.returncode is None: # timed out, or the scan was interrupted
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+
+    return tool_name, log_checking_codes(tool_name, proc.returncode, output, raw_output)
+
+async def run_tools(selected_commands):
+    spinner_task = asyncio.create_task(spinner(active_tools))
+    try:
+        return await asyncio.gather(*(run_tool(tool_name, cmd) for tool_name, cmd in selected_commands.items()))
+    finally:
+        spinner_task.cancel()
+        await asyncio.gather(spinner_task, return_exceptions=True) # let it clear the status line
+
+async def scan(selected_commands):
+    wildcard_task = asyncio.create_task(get_wildcard_length()) if "Ffuf" in selected_commands else None
+    scan_outputs = await run_tools(selected_commands)
+
+    for tool_name, output in scan_outputs:
+        # Failed and timed out tools keep their error message as it is
+        if output.startswith("Error:"):
+            pass
+        # Clean the outputs that aren't filtered line by line while the tools run
+        elif tool_name == "Whatweb":
+            _, _, output = output.partition(" ") # drop the leading URL
+        elif tool_name == "Ffuf":
+            ffuf_results = get_ffuf_results(output)
+            wildcard_length = await wildcard_task
+            # Without the wildcard length there's nothing to filter by, so every result is kept
+            filtered_results = filter_by_length(ffuf_results, wildcard_length) if wildcard_length is not None else ffuf_results
             output = "\n".join(
-                f'{r["input"]["FUZZ"]} [Status: {r["status"]}, Size: {r["length"]}, Words: {r["words"]}, Lines: {r["lines"]}, Words: {r["words"]}]' # TODO: I'd prefer shows all the response, not only these properties
+                f'{r["input"]["FUZZ"]} [Status: {status}, Size: {size}, Words: {words}, Lines: {lines}]' # TODO: I'd prefer shows all the response, not only these properties
                 for r in filtered_results
+                for status, size, words, lines in (FFUF_FIELDS(r),)
             )
-    elif tool_name == "Nikto":
-        seen_paths = set()
-        filtered_lines = []
 
-        for line in output.splitlines():
-            if not line.startswith("+") or line.startswith("+-"):
-                continue  # Skip headers, formatting lines
+        results.append({
+            "Tool": tool_name,
+            "Result": output
+        })
 
-            parts = line.split()
-            path = next((p for p in parts if p.startswith("/")), None)
+    if wildcard_task:
+        wildcard_task.cancel() # still pending if ffuf failed or timed out and the probe wasn't needed
 
-            if path:
-                basename = os.path.splitext(os.path.basename(path))[0]
-                if basename in seen_paths:
-                    continue
-                seen_paths.add(basename)
+# ─── Save Results to CSV ───────────────────────────────────────────────────────
+csv_filename = "scan_results.csv"
 
-            filtered_lines.append(line.strip())
+def write_csv(results, csv_filename):
+    with open(csv_filename, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
 
-        output = "\n".join(filtered_lines)
+        writer.writerow(["Tool", "Result"])
+        writer.writerows((row["Tool"], row["Result"]) for row in results)
 
-    results.append({
-        "Tool": tool_name,
-        "Result": output.strip()
-    })
+# ─── Display ───────────────────────────────────────────────────────────
+# In display order. The functions print straight to the terminal, so they run one after another
+DISPLAYS = {
+    "Nmap": display_nmap_result,
+    "Whatweb": display_whatweb_result,
+    "Wafwoof": display_wafwoof_result,
+    "Ffuf": display_ffuf_result,
+    "Nikto": display_nikto_result
+}
 
-# ─── Save Results to CSV ───────────────────────────────────────────────────────
-csv_filename = "scan_results.csv"
-logging.info(f"Saving results to {csv_filename}")
+def display_results(results):
+    results_by_tool = {row["Tool"]: row["Result"] for row in results} # the results are already in memory, no need to read the CSV back
 
-with open("scan_results.csv", "w", newline="") as csvfile:
-    fieldnames = ["Tool", "Result"]
-    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+    for tool_name, display in DISPLAYS.items():
+        if tool_name in results_by_tool:
+            display(results_by_tool[tool_name])
 
-    writer.writeheader()
-    for row in results:
-        writer.writerow(row)
+    display_tool_summary(results)
 
-# ─── Display ───────────────────────────────────────────────────────────
-logging.info("Reading and displaying results...")
-
-csv_file = pd.read_csv("scan_results.csv")
-
-# -- nmap --
-nmap_row = csv_file[csv_file["Tool"] == "Nmap"]
-if not nmap_row.empty:
-    raw_output = nmap_row["Result"].values[0]
-    display_nmap_result(raw_output)
-
-# -- WhatWeb --
-whatweb_row = csv_file[csv_file["Tool"] == "Whatweb"]
-if not whatweb_row.empty:
-    raw_output = whatweb_row["Result"].values[0]
-    display_whatweb_result(raw_output)
-
-# -- Wafwoof --
-wafwoof = csv_file[csv_file["Tool"] == "Wafwoof"]
-if not wafwoof.empty:
-    raw_output = wafwoof["Result"].values[0]
-    display_wafwoof_result(raw_output)
-
-# -- Ffuf --
-ffuf_row = csv_file[csv_file["Tool"] == "Ffuf"]
-if not ffuf_row.empty:
-    raw_output = ffuf_row["Result"].values[0]
-    display_ffuf_result(raw_output)
-    
-# -- Nikto --
-nikto_row = csv_file[csv_file["Tool"] == "Nikto"]
-if not nikto_row.empty:
-    raw_output = nikto_row["Result"].values[0]
-    display_nikto_result(raw_output)
-    
-display_tool_summary(results)
-    
-logging.info(f"Scan complete. Results saved to {csv_filename}")
+async def main():
+    await scan(filterCommands())
+
+    logging.info(f"Saving results to {csv_filename}")
+    logging.info("Displaying results...")
+    # Both run in worker threads, so the CSV is written while the results are rendered
+    await asyncio.gather(
+        asyncio.to_thread(write_csv, results, csv_filename),
+        asyncio.to_thread(display_results, results)
+    )
+
+    logging.info(f"Scan complete. Results saved to {csv_filename}")
+
+asyncio.run(main())